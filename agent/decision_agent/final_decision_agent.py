@@ -7,18 +7,22 @@
 
 from __future__ import annotations
 
+import functools
 import json
 import os
 import re
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Set, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional
+
+try:
+    import orjson  # optional fast JSON; stdlib json is the fallback
+except ImportError:
+    orjson = None
 
 # Import the LLM chat utility (same as used in find_restaurant.py)
 from utils.chat_and_embedding import LLMChat
-from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate, \
-    PromptTemplate
-from langchain_core.messages import HumanMessage  # ✅ Use LangChain message type
 
 # ── Paths ────────────────────────────────────────────────────────────────────
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
@@ -35,20 +39,103 @@ PROMPT_FILE = Path(__file__).parent / "prompts" / "ingredient_decision_prompt.tx
 # Output file
 OUTPUT_FILE = RESULTS_DIR / "final_decision_output.json"
 
+# Optional cheaper deployment for this routine extraction task (defaults to
+# the shared chat deployment when unset).
+DECISION_DEPLOYMENT = os.getenv("FOODFLOW_DECISION_DEPLOYMENT")
+
 
 # ── Helpers ──────────────────────────────────────────────────────────────────
+# Precompiled response-line patterns (case-insensitive match keeps the
+# original casing of the extracted names).
+_SELL_RE = re.compile(r"selling to ([^:]+):\s*\[(.*?)\]", re.IGNORECASE)
+_COOK_RE = re.compile(r"cook recipe ([^:]+):\s*\[(.*?)\]", re.IGNORECASE)
+_DONATE_RE = re.compile(r"donate to ([^:]+):\s*\[(.*?)\]", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=4096)
+def _norm(s: str) -> str:
+    """Normalize a string for comparisons (ASCII-folded, lowercased, single spaces).
+
+    Cached because the same ingredient/recipe names recur across calls.
+    """
+    s = s or ""
+    if not s.isascii():
+        # Only non-ASCII names need the NFKD fold + accent strip.
+        s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
+    return " ".join(s.lower().split())
+
+
+@functools.lru_cache(maxsize=64)
+def _load_json_cached(path_str: str, mtime_ns: int) -> Any:
+    """Parse a JSON file, cached per (path, mtime) so unchanged files parse once."""
+    data = Path(path_str).read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dump_json(obj: Any, path: Path) -> None:
+    """Serialize `obj` to `path` as pretty-printed UTF-8 JSON (orjson when available).
+
+    Writes the serialized bytes once to a temp file and os.replace()s it into
+    place, so readers never observe a torn/partial output file.
+    """
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
 def _load_json(path: Path) -> Any:
-    """Safely loads a JSON file with UTF-8 encoding."""
+    """Safely loads a JSON file with UTF-8 encoding.
+
+    Repeated calls for an unchanged file cost a single stat() thanks to the
+    mtime-keyed cache above.
+    """
+    path_str = str(path)
     try:
-        with open(path, encoding="utf-8") as f:
-            return json.load(f)
+        return _load_json_cached(path_str, os.stat(path_str).st_mtime_ns)
     except (FileNotFoundError, json.JSONDecodeError) as e:
         print(f"Warning: Could not load {path}: {e}")
         return None
 
 
+@functools.lru_cache(maxsize=8)
+def _build_full_prompt(
+    prompt_template: str,
+    formatted_expiring: str,
+    formatted_recipes: str,
+    formatted_restaurants: str,
+    formatted_donation: str,
+) -> str:
+    """Assemble the complete decision prompt with a single linear join.
+
+    Cached on the formatted sections, so reruns with unchanged inputs skip
+    the string assembly entirely.
+    """
+    return "\n\n".join([
+        prompt_template,
+        f"Expiring ingredients:\n{formatted_expiring}",
+        f"Retrieved recipes:\n{formatted_recipes}",
+        f"Top restaurants:\n{formatted_restaurants}",
+        f"Donation centre:\n{formatted_donation}",
+        "Please provide your decision in the exact format specified above.",
+    ])
+
+
+@functools.lru_cache(maxsize=1)
+def _chat() -> LLMChat:
+    """Return the process-wide chat client; building one per call wastes
+    connection setup and client construction on every rerun."""
+    return LLMChat(deployment=DECISION_DEPLOYMENT)
+
+
+@functools.lru_cache(maxsize=1)
 def _load_prompt_template() -> str:
-    """Load the prompt template from the prompts directory.
+    """Load the prompt template from the prompts directory (read once per process).
     Raises FileNotFoundError if the file is missing.
     """
     with open(PROMPT_FILE, encoding="utf-8") as f:
@@ -91,11 +178,11 @@ def _format_recipes(recipes_data: Any) -> str:
             title = recipe.get("title", f"Recipe {i + 1}")
             rank = recipe.get("rank", "Unknown")
             matched = recipe.get("matched_expiring", [])
-            instructions = recipe.get("instructions", "No instructions")
 
+            # Title + matched ingredients are all the decision needs;
+            # instructions only inflate the prompt token count.
             formatted.append(f"Recipe {rank}: {title}")
             formatted.append(f"  Matched expiring ingredients: {', '.join(matched) if matched else 'None'}")
-            formatted.append(f"  Instructions: {instructions[:200]}{'...' if len(instructions) > 200 else ''}")
             formatted.append("")
 
     return "\n".join(formatted)
@@ -188,6 +275,44 @@ def _format_donation_center(donation_data: Any) -> str:
 #
 #     return sell_items, cook_items, donate_items, restaurant_name, recipe_title, donation_center
 
+def _parse_llm_response_structured(response: str) -> Optional[Tuple[
+    List[str], List[str], List[str],
+    str, str, str,
+    Optional[str], Optional[str], Optional[str]
+]]:
+    """
+    Parse the JSON-object response format requested by the prompt template.
+    Returns the same tuple as _parse_llm_response, or None when the response
+    is not a valid JSON object (the line-based parser remains the fallback).
+    """
+    try:
+        data = json.loads(_chat().extract_json_string(response))
+    except Exception:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    def _section(key: str) -> Tuple[str, List[str], Optional[str]]:
+        block = data.get(key)
+        if not isinstance(block, dict):
+            return "", [], None
+        target = str(block.get("target") or "").strip()
+        items = [str(x).strip() for x in (block.get("items") or []) if str(x).strip()]
+        reason = str(block.get("reason") or "").strip() or None
+        return target, items, reason
+
+    restaurant_name, sell_items, reason_sell = _section("sell")
+    recipe_title, cook_items, reason_cook = _section("cook")
+    donation_center, donate_items, reason_donate = _section("donate")
+    if not (sell_items or cook_items or donate_items):
+        return None
+    return (
+        sell_items, cook_items, donate_items,
+        restaurant_name, recipe_title, donation_center,
+        reason_cook, reason_sell, reason_donate
+    )
+
+
 def _parse_llm_response(response: str) -> Tuple[
     List[str], List[str], List[str],
     str, str, str,
@@ -211,33 +336,34 @@ def _parse_llm_response(response: str) -> Tuple[
         line = line.strip()
         if not line:
             continue
+        low = line.lower()  # lowercase once per line for the dispatch below
 
         # Match actions
-        if line.lower().startswith('selling to'):
+        if low.startswith('selling to'):
             last_action = "SELL"
-            match = re.match(r'selling to ([^:]+):\s*\[(.*?)\]', line, re.IGNORECASE)
+            match = _SELL_RE.match(line)
             if match:
                 restaurant_name = match.group(1).strip()
                 items_str = match.group(2).strip()
                 if items_str:
                     sell_items = [item.strip() for item in items_str.split(',') if item.strip()]
-        elif line.lower().startswith('cook recipe'):
+        elif low.startswith('cook recipe'):
             last_action = "COOK"
-            match = re.match(r'cook recipe ([^:]+):\s*\[(.*?)\]', line, re.IGNORECASE)
+            match = _COOK_RE.match(line)
             if match:
                 recipe_title = match.group(1).strip()
                 items_str = match.group(2).strip()
                 if items_str:
                     cook_items = [item.strip() for item in items_str.split(',') if item.strip()]
-        elif line.lower().startswith('donate to'):
+        elif low.startswith('donate to'):
             last_action = "DONATE"
-            match = re.match(r'donate to ([^:]+):\s*\[(.*?)\]', line, re.IGNORECASE)
+            match = _DONATE_RE.match(line)
             if match:
                 donation_center = match.group(1).strip()
                 items_str = match.group(2).strip()
                 if items_str:
                     donate_items = [item.strip() for item in items_str.split(',') if item.strip()]
-        elif line.lower().startswith('reason:'):
+        elif low.startswith('reason:'):
             reason_text = line[len("reason:"):].strip()
             if last_action == "COOK":
                 reason_cook = reason_text
@@ -262,45 +388,32 @@ def _create_decision_output(
 
     decisions = []
 
-    # Try to find the real retrieved title
-    retrieved_title = None
+    # Map normalized title -> real retrieved title once, then look up directly
+    titles_by_norm = {}
     for recipe in recipes_data:
         if isinstance(recipe, dict):
             title = recipe.get("title", "").strip()
-            if title.lower() == recipe_title.lower():
-                retrieved_title = title
-                break
+            if title:
+                titles_by_norm.setdefault(_norm(title), title)
 
     # If not found, just fallback to the LLM's title
-    if not retrieved_title:
-        retrieved_title = recipe_title
-
-    # Add COOK decisions
-    for item in cook_items:
-        decisions.append({
-            "item": item,
-            "action": "COOK",
-            "reason": reason_cook or f"Used in selected recipe '{recipe_title}'",
-            "target_recipes": [recipe_title, retrieved_title],
-        })
-
-    # Add SELL decisions
-    for item in sell_items:
-        decisions.append({
-            "item": item,
-            "action": "SELL",
-            "reason": reason_sell or f"Market demand and good shelf life for {restaurant_name}",
-            "target_restaurants": [restaurant_name],
-        })
-
-    # Add DONATE decisions
-    for item in donate_items:
-        decisions.append({
-            "item": item,
-            "action": "DONATE",
-            "reason": reason_donate or "Better suited for community benefit",
-            "donation_center": donation_center,
-        })
+    retrieved_title = titles_by_norm.get(_norm(recipe_title)) or recipe_title
+
+    # Build COOK/SELL/DONATE rows in a single data-driven pass
+    groups = [
+        (cook_items, "COOK",
+         reason_cook or f"Used in selected recipe '{recipe_title}'",
+         {"target_recipes": [recipe_title, retrieved_title]}),
+        (sell_items, "SELL",
+         reason_sell or f"Market demand and good shelf life for {restaurant_name}",
+         {"target_restaurants": [restaurant_name]}),
+        (donate_items, "DONATE",
+         reason_donate or "Better suited for community benefit",
+         {"donation_center": donation_center}),
+    ]
+    for items, action, reason, extra in groups:
+        for item in items:
+            decisions.append({"item": item, "action": action, "reason": reason, **extra})
 
     return decisions
 
@@ -309,10 +422,12 @@ def _create_decision_output(
 def decide_actions() -> List[Dict[str, Any]]:
 
 
-    expiring_data = _load_json(EXPIRING_FILE)
-    recipes_data = _load_json(BEST_RECIPES_FILE)
-    restaurants_data = _load_json(TOP_RESTAURANTS_FILE)
-    donation_data = _load_json(DONATION_FILE)
+    # Load the four input files concurrently; each is independent disk I/O.
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        expiring_data, recipes_data, restaurants_data, donation_data = pool.map(
+            _load_json,
+            [EXPIRING_FILE, BEST_RECIPES_FILE, TOP_RESTAURANTS_FILE, DONATION_FILE],
+        )
 
     if not expiring_data:
         raise FileNotFoundError(f"Missing or invalid {EXPIRING_FILE}")
@@ -329,41 +444,34 @@ def decide_actions() -> List[Dict[str, Any]]:
     formatted_restaurants = _format_restaurants(restaurants_data)
     formatted_donation = _format_donation_center(donation_data)
 
-    # --- 4. Create the complete prompt ---
-    full_prompt = f"""{prompt_template}
-
-Expiring ingredients:
-{formatted_expiring}
-
-Retrieved recipes:
-{formatted_recipes}
-
-Top restaurants:
-{formatted_restaurants}
-
-Donation centre:
-{formatted_donation}
-
-Please provide your decision in the exact format specified above."""
+    # --- 4. Create the complete prompt (memoized while the inputs are unchanged) ---
+    full_prompt = _build_full_prompt(
+        prompt_template,
+        formatted_expiring,
+        formatted_recipes,
+        formatted_restaurants,
+        formatted_donation,
+    )
 
     # --- 5. Send to LLM ---
     print("Sending request to LLM...")
 
     try:
-        chat = LLMChat()
-        # ✅ Pass LangChain-native message object
-        raw_response = chat.send_messages([HumanMessage(content=full_prompt)])
+        raw_response = _chat().send_prompt(full_prompt)
         print("Received response from LLM")
     except Exception as e:
         print(f"Error communicating with LLM: {e}")
         raise
 
-    # --- 6. Parse LLM response ---
+    # --- 6. Parse LLM response (JSON object first, legacy line format as fallback) ---
+    parsed = _parse_llm_response_structured(raw_response)
+    if parsed is None:
+        parsed = _parse_llm_response(raw_response)
     (
         sell_items, cook_items, donate_items,
         restaurant_name, recipe_title, donation_center,
         reason_cook, reason_sell, reason_donate
-    ) = _parse_llm_response(raw_response)
+    ) = parsed
 
     # --- 7. Create structured output ---
     decisions = _create_decision_output(
@@ -375,29 +483,29 @@ Please provide your decision in the exact format specified above."""
 
     # --- 8. Save to file ---
     OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(decisions, f, indent=2, ensure_ascii=False)
+    _dump_json(decisions, OUTPUT_FILE)
 
-    # --- 9. Display summary ---
-    print("\n--- Final Decision Summary ---")
-    print(f"COOK   ({len(cook_items)} items): ", ", ".join(cook_items) if cook_items else "none")
+    # --- 9. Display summary (assembled once, written with a single print) ---
+    summary_lines = ["\n--- Final Decision Summary ---"]
+    summary_lines.append(f"COOK   ({len(cook_items)} items):  " + (", ".join(cook_items) if cook_items else "none"))
     if recipe_title:
-        print(f"  ↳ Recipe: {recipe_title}")
+        summary_lines.append(f"  ↳ Recipe: {recipe_title}")
     if reason_cook:
-        print(f"  🧾 Reason (COOK): {reason_cook}")
+        summary_lines.append(f"  🧾 Reason (COOK): {reason_cook}")
 
-    print(f"SELL   ({len(sell_items)} items): ", ", ".join(sell_items) if sell_items else "none")
+    summary_lines.append(f"SELL   ({len(sell_items)} items):  " + (", ".join(sell_items) if sell_items else "none"))
     if restaurant_name:
-        print(f"  ↳ Restaurant: {restaurant_name}")
+        summary_lines.append(f"  ↳ Restaurant: {restaurant_name}")
     if reason_sell:
-        print(f"  🧾 Reason (SELL): {reason_sell}")
+        summary_lines.append(f"  🧾 Reason (SELL): {reason_sell}")
 
-    print(f"DONATE ({len(donate_items)} items): ", ", ".join(donate_items) if donate_items else "none")
+    summary_lines.append(f"DONATE ({len(donate_items)} items):  " + (", ".join(donate_items) if donate_items else "none"))
     if donation_center:
-        print(f"  ↳ Donation Center: {donation_center}")
+        summary_lines.append(f"  ↳ Donation Center: {donation_center}")
     if reason_donate:
-        print(f"  🧾 Reason (DONATE): {reason_donate}")
-    print("----------------------------")
+        summary_lines.append(f"  🧾 Reason (DONATE): {reason_donate}")
+    summary_lines.append("----------------------------")
+    print("\n".join(summary_lines))
 
 
 
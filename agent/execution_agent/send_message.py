@@ -13,11 +13,17 @@ Each message is saved under results/messages/.
 """
 
 from __future__ import annotations
-import json, os, re
+import functools, json, os, re, sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 from utils.chat_and_embedding import LLMChat   # wrapper around Azure GPT
 
+try:
+    import orjson  # optional fast JSON; stdlib json is the fallback
+except ImportError:
+    orjson = None
+
 # --- Paths ---
 PROJECT_ROOT   = Path(__file__).resolve().parents[2]
 RESULTS_DIR    = PROJECT_ROOT / "results"
@@ -28,29 +34,55 @@ MESSAGES_DIR   = RESULTS_DIR / "messages"
 DECISIONS_FILE = RESULTS_DIR / "final_decision_output.json"
 EXPIRING_FILE  = DATA_DIR / "expiring_ingredients.json"
 
+MSG_RESTAURANT_PATH = MESSAGES_DIR / "message_to_restaurant.txt"
+MSG_KITCHEN_PATH    = MESSAGES_DIR / "message_to_soup_kitchen.txt"
+
 DEFAULT_RESTAURANT_NAME = "HaSalon"
 DEFAULT_CITY = "Tel Aviv"
 
 # Mock contact number; real number can be passed via env var
 CONTACT_PHONE = os.getenv("FOODFLOW_CONTACT_PHONE", "052-1234567")
 
+# All phone placeholders the model tends to emit, as one precompiled alternation.
+_PHONE_PLACEHOLDER_RE = re.compile(
+    r"\[\s*(?:insert\s*)?phone(?:\s*number)?\s*\]"
+    r"|\(\s*phone\s*\)"
+    r"|\{\s*phone\s*\}"
+    r"|\b(?:XXX-XXX-XXXX|000-000-0000)\b",
+    re.IGNORECASE,
+)
+
 # ---------------- helpers ----------------
+@functools.lru_cache(maxsize=1)
+def _ensure_messages_dir() -> None:
+    """Create MESSAGES_DIR once per process; repeat calls skip the syscall."""
+    MESSAGES_DIR.mkdir(parents=True, exist_ok=True)
+
+
+@functools.lru_cache(maxsize=8)
+def _chat(temp: float) -> LLMChat:
+    """Reuse one LLMChat client per temperature instead of rebuilding the
+    Azure client (and its HTTP session) for every drafted message."""
+    return LLMChat(temp=temp)
+
+
+@functools.lru_cache(maxsize=4096)
 def _norm(s: str) -> str:
     """Normalize a string for dictionary lookups (lowercased, no extra spaces)."""
-    return re.sub(r"\s+", " ", (s or "").strip().lower())
+    # str.split/join collapses and strips whitespace in C, no regex needed.
+    return " ".join((s or "").lower().split())
 
 def _load_json(path: Path) -> Any:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def _load_expiring_map() -> Dict[str, Dict[str, Any]]:
-    """
-    Load expiring ingredients and build a lookup:
-    normalized_name -> {quantity, unit, days_to_expire}
-    """
-    if not EXPIRING_FILE.exists():
-        return {}
-    raw = _load_json(EXPIRING_FILE)
+    data = path.read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+@functools.lru_cache(maxsize=4)
+def _load_expiring_map_cached(path_str: str, mtime_ns: int) -> Dict[str, Dict[str, Any]]:
+    """Parse expiring ingredients and build the normalized lookup, cached per
+    (path, mtime) so an unchanged file is parsed once per process."""
+    raw = _load_json(Path(path_str))
     out: Dict[str, Dict[str, Any]] = {}
     for row in raw:
         if not isinstance(row, dict): continue
@@ -64,6 +96,17 @@ def _load_expiring_map() -> Dict[str, Dict[str, Any]]:
         }
     return out
 
+def _load_expiring_map() -> Dict[str, Dict[str, Any]]:
+    """
+    Load expiring ingredients and build a lookup:
+    normalized_name -> {quantity, unit, days_to_expire}
+    """
+    try:
+        st = EXPIRING_FILE.stat()
+    except OSError:
+        return {}
+    return _load_expiring_map_cached(str(EXPIRING_FILE), st.st_mtime_ns)
+
 def _group_from_decisions(
     restaurant_hint: Optional[str] = None,
     soup_kitchen_hint: Optional[str] = None,
@@ -72,35 +115,55 @@ def _group_from_decisions(
     Read final_decision_output.json and group items by SELL/restaurant and DONATE/kitchen.
     Returns: (restaurant_name, sell_items[], soup_kitchen_name, donate_items[])
     """
-    if not DECISIONS_FILE.exists():
-        raise FileNotFoundError(f"Missing decisions file: {DECISIONS_FILE}")
-    decisions = _load_json(DECISIONS_FILE)
+    try:
+        decisions = _load_json(DECISIONS_FILE)
+    except FileNotFoundError:
+        # No pre-flight exists() check: one open() instead of stat()+open().
+        raise FileNotFoundError(f"Missing decisions file: {DECISIONS_FILE}") from None
     if not isinstance(decisions, list):
         raise ValueError("final_decision_output.json must be a list.")
 
-    sell_by_target, donate_by_target = {}, {}
+    # Single-pass reduction: keep the hinted target (or first one seen) and
+    # collect only its items, instead of grouping every target into dicts
+    # that are immediately thrown away.
+    sell_target, donate_target = restaurant_hint, soup_kitchen_hint
+    sell_items: List[str] = []
+    donate_items: List[str] = []
     for row in decisions:
         if not isinstance(row, dict): continue
+        # Cheap action filter first; only normalize the item for rows we keep.
+        action = row.get("action")
+        if action not in ("SELL", "DONATE"):
+            action = (action or "").strip().upper()
+            if action not in ("SELL", "DONATE"):
+                continue
         item = (row.get("item") or "").strip()
-        action = (row.get("action") or "").strip().upper()
         if action == "SELL":
             trg_list = row.get("target_restaurants") or []
             trg = str(trg_list[0]).strip() if isinstance(trg_list, list) and trg_list else "Nearby partner"
-            sell_by_target.setdefault(trg, []).append(item)
+            if sell_target is None:
+                sell_target = trg
+            if trg == sell_target:
+                sell_items.append(item)
         elif action == "DONATE":
             trg = str(row.get("donation_center") or "").strip() or "Local soup kitchen"
-            donate_by_target.setdefault(trg, []).append(item)
+            if donate_target is None:
+                donate_target = trg
+            if trg == donate_target:
+                donate_items.append(item)
+
+    return sell_target or "", sell_items, donate_target or "", donate_items
+
+_EMPTY: Dict[str, Any] = {}
 
-    # Choose targets (first found, unless hints provided)
-    restaurant_name = restaurant_hint or (next(iter(sell_by_target)) if sell_by_target else "")
-    soup_kitchen_name = soup_kitchen_hint or (next(iter(donate_by_target)) if donate_by_target else "")
-    return restaurant_name, sell_by_target.get(restaurant_name, []), soup_kitchen_name, donate_by_target.get(soup_kitchen_name, [])
 
 def _prep_item_lines(items: List[str], exp_map: Dict[str, Dict[str, Any]]) -> List[str]:
     """Format expiring items with qty/unit/expiry into human-readable bullet lines."""
+    # Normalize in bulk (cached) and resolve metadata up front; the shared
+    # _EMPTY sentinel avoids allocating a fresh dict per missing item.
+    metas = [exp_map.get(n, _EMPTY) for n in map(_norm, items)]
     lines = []
-    for it in items:
-        meta = exp_map.get(_norm(it), {})
+    for it, meta in zip(items, metas):
         q, u, d = meta.get("quantity"), meta.get("unit"), meta.get("days_to_expire")
         qty = f"{q:.2f}" if isinstance(q, (int, float)) else (str(q) if q is not None else "")
         exp  = f"{d} days" if isinstance(d, (int, float)) else ("soon" if d is not None else "n/a")
@@ -116,14 +179,8 @@ def _ensure_contact_phone(text: str) -> str:
     """
     if CONTACT_PHONE in text:
         return text
-    patterns = [r"\[\s*phone\s*number\s*\]", r"\[\s*insert\s*phone\s*number\s*\]",
-                r"\[\s*phone\s*\]", r"\(\s*phone\s*\)", r"\{\s*phone\s*\}",
-                r"\b(?:XXX-XXX-XXXX|000-000-0000)\b"]
-    new_text, replaced = text, False
-    for pat in patterns:
-        if re.search(pat, new_text, flags=re.IGNORECASE):
-            new_text = re.sub(pat, CONTACT_PHONE, new_text, flags=re.IGNORECASE); replaced = True
-    if not replaced:
+    new_text, n_replaced = _PHONE_PLACEHOLDER_RE.subn(CONTACT_PHONE, text)
+    if not n_replaced:
         new_text += f"\nContact: {CONTACT_PHONE}"
     return new_text
 
@@ -137,7 +194,21 @@ def _gpt_message_to_restaurant(
     """Generate GPT message offering surplus ingredients to a restaurant via WhatsApp-style format."""
     if not sell_lines:
         return ""
+    return _gpt_message_to_restaurant_cached(restaurant, tuple(sell_lines), brand, city)
 
+
+@functools.lru_cache(maxsize=64)
+def _gpt_message_to_restaurant_cached(
+    restaurant: str,
+    sell_lines: Tuple[str, ...],
+    brand: str,
+    city: str
+) -> str:
+    """Draft (and memoize) the restaurant message for one exact input set.
+
+    Redraft/retry flows with identical inputs reuse the first response
+    instead of paying another GPT round-trip.
+    """
     # Format list of items as bullet points
     item_list = "\n".join(f"- {line}" for line in sell_lines)
 
@@ -175,7 +246,7 @@ def _gpt_message_to_restaurant(
 # Respond with just the message (no explanation, no formatting instructions). Add a fake contact number like: 052-1234567
 # """
 
-    response = LLMChat(temp=0.4).send_prompt(prompt).strip()
+    response = _chat(0.4).send_prompt(prompt).strip()
     return _ensure_contact_phone(response)
 
 
@@ -188,7 +259,17 @@ def _gpt_message_to_soup_kitchen(
     """Generate GPT message offering food donation to a soup kitchen via WhatsApp-style format."""
     if not donate_lines:
         return ""
+    return _gpt_message_to_soup_kitchen_cached(kitchen, tuple(donate_lines), brand, city)
 
+
+@functools.lru_cache(maxsize=64)
+def _gpt_message_to_soup_kitchen_cached(
+    kitchen: str,
+    donate_lines: Tuple[str, ...],
+    brand: str,
+    city: str
+) -> str:
+    """Draft (and memoize) the soup-kitchen message for one exact input set."""
     item_list = "\n".join(f"- {line}" for line in donate_lines)
 
     prompt = f"""Write a kind, short WhatsApp-style message in English from {brand} in {city} to "{kitchen}".
@@ -223,7 +304,7 @@ def _gpt_message_to_soup_kitchen(
 # Return only the message text (no extra formatting or explanation).
 # """
 
-    response = LLMChat(temp=0.4).send_prompt(prompt).strip()
+    response = _chat(0.4).send_prompt(prompt).strip()
     return _ensure_contact_phone(response)
 
 
@@ -234,25 +315,39 @@ def send_message(restaurant: Optional[str] = None, soup_kitchen: Optional[str] =
     Saves to results/messages/message_to_restaurant.txt and message_to_soup_kitchen.txt.
     Returns dict of output paths.
     """
-    exp_map = _load_expiring_map()
     r_name, sell_items, k_name, donate_items = _group_from_decisions(restaurant, soup_kitchen)
+    if not (r_name and sell_items) and not (k_name and donate_items):
+        # Nothing to draft; skip the expiring-map load and the LLM entirely.
+        print("No messages generated.")
+        return {}
 
+    exp_map = _load_expiring_map()
     sell_lines, donate_lines = _prep_item_lines(sell_items, exp_map), _prep_item_lines(donate_items, exp_map)
-    MESSAGES_DIR.mkdir(parents=True, exist_ok=True)
+    _ensure_messages_dir()
     out_paths = {}
 
-    if r_name and sell_lines:
-        msg_r = _gpt_message_to_restaurant(r_name, sell_lines)
-        r_path = MESSAGES_DIR / "message_to_restaurant.txt"
-        r_path.write_text(msg_r, encoding="utf-8")
-        print("\n====== Message to restaurant ======\n", msg_r); out_paths["restaurant_message_path"] = str(r_path)
-
-    if k_name and donate_lines:
-        msg_k = _gpt_message_to_soup_kitchen(k_name, donate_lines)
-        k_path = MESSAGES_DIR / "message_to_soup_kitchen.txt"
-        k_path.write_text(msg_k, encoding="utf-8")
-        print("\n====== Message to soup kitchen ======\n", msg_k); out_paths["soup_kitchen_message_path"] = str(k_path)
-
-    if not out_paths: print("No messages generated.")
+    # Draft both messages concurrently; each is an independent GPT round-trip.
+    fut_r = fut_k = None
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        if r_name and sell_lines:
+            fut_r = pool.submit(_gpt_message_to_restaurant, r_name, sell_lines)
+        if k_name and donate_lines:
+            fut_k = pool.submit(_gpt_message_to_soup_kitchen, k_name, donate_lines)
+
+    # Collect console output and flush it in one write instead of per-line prints.
+    console: List[str] = []
+    if fut_r is not None:
+        msg_r = fut_r.result()
+        MSG_RESTAURANT_PATH.write_text(msg_r, encoding="utf-8")
+        console.append("\n====== Message to restaurant ======\n" + msg_r)
+        out_paths["restaurant_message_path"] = str(MSG_RESTAURANT_PATH)
+
+    if fut_k is not None:
+        msg_k = fut_k.result()
+        MSG_KITCHEN_PATH.write_text(msg_k, encoding="utf-8")
+        console.append("\n====== Message to soup kitchen ======\n" + msg_k)
+        out_paths["soup_kitchen_message_path"] = str(MSG_KITCHEN_PATH)
+
+    sys.stdout.write("\n".join(console) + "\n" if console else "No messages generated.\n")
     return out_paths
 
@@ -12,23 +12,82 @@ message to results/messages/message_to_kitchen.txt explaining the reason.
 """
 from __future__ import annotations
 
+import functools
 import json
+import os
+import string
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson  # optional: much faster JSON parsing
+except ImportError:
+    orjson = None
+
+try:
+    from rapidfuzz import fuzz as _rf_fuzz, process as _rf_process  # optional C++ fuzzy scorer
+except ImportError:
+    _rf_fuzz = _rf_process = None
 
 # --- Constants ---
 PROJECT_ROOT      = Path(__file__).resolve().parents[2]
 RESULTS_DIR       = PROJECT_ROOT / "results"
 MESSAGES_DIR      = RESULTS_DIR / "messages"
 RECIPES_DIR       = RESULTS_DIR / "recipes"
+RETRIEVED_DIR     = RECIPES_DIR / "retrieved"
 
 DECISION_FILE     = RESULTS_DIR / "final_decision_output.json"
 BEST_RECIPES_FILE = RECIPES_DIR / "best_matching_recipes.json"
+RETRIEVED_INDEX   = RETRIEVED_DIR / ".retrieved_index.json"
+
+# Minimum token-overlap (Dice) score for the fuzzy retrieved-title fallback.
+_FUZZY_MIN_SCORE = 0.35
 
 
 # --------------------------- helpers ---------------------------
 
-def _load_json(path: Path) -> Any:
+# Translation table built once at import: maps every byte outside [a-z0-9 ]
+# to a space so hyphenated/punctuated words still split into separate tokens
+# ("tomato-soup" -> "tomato soup"). str.translate is a tight C loop, cheaper
+# than a regex pass; the split/join in _simplify collapses the extra spaces.
+_PUNCT_TO_SPACE = str.maketrans({
+    chr(c): " " for c in range(256) if chr(c) not in string.ascii_lowercase + string.digits + " "
+})
+
+
+@functools.lru_cache(maxsize=4096)
+def _strip_accents(s: str) -> str:
+    """ASCII-fold a string (e.g. 'crème' -> 'creme')."""
+    if s.isascii():  # common case: skip the NFKD table walk and encode round-trip
+        return s
+    return unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
+
+
+@functools.lru_cache(maxsize=4096)
+def _norm(s: str) -> str:
+    """Normalize a title for comparisons: accent-free, lowercased, single spaces."""
+    return " ".join(_strip_accents(s or "").lower().split())
+
+
+@functools.lru_cache(maxsize=4096)
+def _simplify(s: str) -> str:
+    """Like _norm but with punctuation removed, for relaxed title matching."""
+    return " ".join(_norm(s).translate(_PUNCT_TO_SPACE).split())
+
+
+@functools.lru_cache(maxsize=4096)
+def _tokenize(s: str) -> tuple:
+    """Split a simplified title into tokens (tuple so the cache can hold it)."""
+    return tuple(_simplify(s).split())
+
+
+def _load_json(path: "Path | str") -> Any:
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
@@ -63,43 +122,234 @@ def _selected_recipe_title(path: Path) -> Optional[str]:
     return None
 
 
-def _find_recipe_in_best(title: str, recipes: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-    """Find a recipe by exact title inside best_matching_recipes.json (case-insensitive)."""
-    title_norm = title.strip().lower()
-    for r in recipes or []:
-        if r.get("title", "").strip().lower() == title_norm:
-            return r
-    return None
+def _build_title_index(recipes: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Index recipes by normalized title for O(1) lookups instead of linear scans."""
+    return {_norm(r.get("title", "")): r for r in recipes or [] if isinstance(r, dict)}
+
+
+def _find_recipe_in_best(title: str, title_index: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Find a recipe by exact title in the normalized-title index (case/accent-insensitive)."""
+    return title_index.get(_norm(title))
+
+
+def _scan_retrieved() -> Tuple[Tuple[str, int], ...]:
+    """
+    List the retrieved_dish*.json files as (path, mtime_ns) pairs.
+
+    One os.scandir pass replaces Path.glob: no fnmatch per entry, no Path
+    construction, and DirEntry.stat() reuses data the scan already has, so
+    the mtimes for the cache key below come for free.
+    """
+    try:
+        with os.scandir(RETRIEVED_DIR) as it:
+            entries = [
+                (e.path, e.stat().st_mtime_ns)
+                for e in it
+                if e.name.startswith("retrieved_dish") and e.name.endswith(".json") and e.is_file()
+            ]
+    except OSError:
+        return ()
+    entries.sort()
+    return tuple(entries)
+
+
+# Candidate tuple: (payload, normalized title, simplified title, title tokens).
+_Candidate = Tuple[Dict[str, Any], str, str, frozenset]
+# Retrieved bundle: candidates, exact-lookup dicts keyed by the normalized and
+# simplified titles (first occurrence wins; files arrive in score order), and
+# an inverted token index for pruning the fuzzy tier.
+_Retrieved = Tuple[
+    List[_Candidate],
+    Dict[str, Dict[str, Any]],
+    Dict[str, Dict[str, Any]],
+    Dict[str, List[int]],
+]
+
+
+def _index_candidates(candidates: List[_Candidate]) -> _Retrieved:
+    """Build the exact-lookup dicts and the token inverted index."""
+    by_norm: Dict[str, Dict[str, Any]] = {}
+    by_simple: Dict[str, Dict[str, Any]] = {}
+    inv_index: Dict[str, List[int]] = {}
+    for i, (payload, norm_t, simple_t, tokens) in enumerate(candidates):
+        by_norm.setdefault(norm_t, payload)
+        by_simple.setdefault(simple_t, payload)
+        for tok in tokens:
+            inv_index.setdefault(tok, []).append(i)
+    return candidates, by_norm, by_simple, inv_index
+
+
+def _load_all_retrieved() -> _Retrieved:
+    """
+    Load every retrieved_dish*.json the recipe agent saved and return
+    candidates for the fuzzy title fallback, each carrying its payload plus
+    the precomputed normalized/simplified/tokenized title, alongside dicts
+    for O(1) exact-title lookups. Results are memoized per directory state
+    (one scandir sweep instead of a re-parse when nothing changed). Never
+    raises.
+    """
+    entries = _scan_retrieved()
+    if not entries:
+        return [], {}, {}, {}
+    return _load_all_retrieved_cached(entries)
+
+
+def _read_index(signature: list) -> Optional[List[_Candidate]]:
+    """Load the persisted candidate index if it matches the directory state."""
+    try:
+        idx = _load_json(RETRIEVED_INDEX)
+    except Exception:
+        return None
+    if not isinstance(idx, dict) or idx.get("signature") != signature:
+        return None
+    try:
+        return [
+            (payload, norm_t, simple_t, frozenset(tokens))
+            for payload, norm_t, simple_t, tokens in idx["candidates"]
+        ]
+    except Exception:
+        return None
+
+
+def _write_index(signature: list, candidates: List[_Candidate]) -> None:
+    """Persist the parsed candidates next to the source files (best effort)."""
+    doc = {
+        "signature": signature,
+        "candidates": [[p, n, s, sorted(t)] for p, n, s, t in candidates],
+    }
+    tmp = RETRIEVED_INDEX.with_suffix(".tmp")
+    try:
+        data = orjson.dumps(doc) if orjson is not None else json.dumps(doc, ensure_ascii=False).encode("utf-8")
+        tmp.write_bytes(data)
+        os.replace(tmp, RETRIEVED_INDEX)
+    except (OSError, TypeError, ValueError):
+        pass
+
+
+@functools.lru_cache(maxsize=4)
+def _load_all_retrieved_cached(entries: Tuple[Tuple[str, int], ...]) -> _Retrieved:
+    # A persisted index lets a fresh process skip re-parsing unchanged files.
+    signature = [[p, m] for p, m in entries]
+    cached = _read_index(signature)
+    if cached is not None:
+        return _index_candidates(cached)
+
+    paths = [p for p, _mtime in entries]
+
+    def _safe_load(fp: str) -> Any:
+        try:
+            return _load_json(fp)
+        except Exception:
+            return None
+
+    # The files are small but numerous; overlap the per-file read latency.
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as ex:
+        loaded = list(ex.map(_safe_load, paths))
+
+    candidates: List[_Candidate] = []
+    for obj in loaded:
+        if obj is None:
+            continue
+        rows = obj if isinstance(obj, list) else (
+            obj.get("matches") or obj.get("results") or obj.get("hits") or []
+            if isinstance(obj, dict) else []
+        )
+        for row in rows:
+            payload = row.get("payload") if isinstance(row, dict) else None
+            if not isinstance(payload, dict):
+                continue
+            title = (payload.get("title") or payload.get("name") or "").strip()
+            if not title:
+                continue
+            candidate = dict(payload)
+            candidate["title"] = title
+            # Normalize once here; every lookup tier reuses these fields.
+            candidates.append(
+                (candidate, _norm(title), _simplify(title), frozenset(_tokenize(title)))
+            )
+    _write_index(signature, candidates)
+    return _index_candidates(candidates)
+
+
+def _find_recipe_in_retrieved(title: str, retrieved: _Retrieved) -> Optional[Dict[str, Any]]:
+    """
+    Fallback lookup over the retrieved dish files when the selected title is
+    not in best_matching_recipes.json (the LLM sometimes rephrases titles).
+
+    The exact tier is two dict probes against the prebuilt normalized and
+    simplified title indexes; only a miss pays for the fuzzy scorer.
+    """
+    candidates, by_norm, by_simple, inv_index = retrieved
+    if not candidates:
+        return None
+
+    # Exact (or punctuation-relaxed) match wins outright, in O(1).
+    hit = by_norm.get(_norm(title)) or by_simple.get(_simplify(title))
+    if hit is not None:
+        return hit
+
+    if _rf_process is not None:
+        # RapidFuzz batch-scores every title in C++ and returns the best hit.
+        best = _rf_process.extractOne(
+            title, [payload["title"] for payload, *_ in candidates],
+            scorer=_rf_fuzz.token_set_ratio,
+            score_cutoff=_FUZZY_MIN_SCORE * 100.0,
+        )
+        return candidates[best[2]][0] if best else None
+
+    # Stdlib fallback: Dice token-overlap scored in Python. Candidates that
+    # share no token with the query score zero, so the inverted index prunes
+    # them exactly — only titles with at least one common token get scored.
+    sel_tokens = frozenset(_tokenize(title))
+    blocked: set = set()
+    for tok in sel_tokens:
+        blocked.update(inv_index.get(tok, ()))
+    if not blocked:
+        return None
+
+    best_payload: Optional[Dict[str, Any]] = None
+    best_score = 0.0
+    n_sel = len(sel_tokens)
+    for i in blocked:
+        payload, _norm_t, _simple_t, cand_tokens = candidates[i]
+        score = 2.0 * len(sel_tokens & cand_tokens) / (n_sel + len(cand_tokens))
+        if score > best_score:
+            best_score, best_payload = score, payload
+
+    return best_payload if best_score >= _FUZZY_MIN_SCORE else None
+
+
+def _iter_ingredients(recipe: Dict[str, Any]):
+    """Chain the three ingredient lists lazily instead of concatenating them."""
+    return chain(
+        recipe.get("matched_expiring", []),
+        recipe.get("inventory", []),
+        recipe.get("missing", []),
+    )
 
 
 def _compose_kitchen_message(recipe: Dict[str, Any]) -> str:
     """Formats the kitchen message for a found recipe."""
-    lines = []
-    lines.append("===== KITCHEN DISPATCH =====")
-    lines.append(f"Recipe: {recipe.get('title','(unknown)')}")
-    lines.append("----------------------------")
-
-    ingredients = (
-        recipe.get("matched_expiring", [])
-        + recipe.get("inventory", [])
-        + recipe.get("missing", [])
-    )
-    if ingredients:
-        lines.append("Ingredients:")
-        for it in ingredients:
-            lines.append(f" - {it}")
-    else:
-        lines.append("Ingredients: (not available)")
+    parts = [
+        "===== KITCHEN DISPATCH =====",
+        f"Recipe: {recipe.get('title','(unknown)')}",
+        "----------------------------",
+    ]
+
+    had_ingredients = len(parts)
+    parts.append("Ingredients:")
+    parts.extend(f" - {it}" for it in _iter_ingredients(recipe))
+    if len(parts) == had_ingredients + 1:  # nothing got extended
+        parts[-1] = "Ingredients: (not available)"
 
-    lines.append("----------------------------")
+    parts.append("----------------------------")
 
     reason = recipe.get("reason")
     if reason:
-        lines.append("Chef Notes / Reason:")
-        lines.append(f" {reason}")
+        parts.extend(("Chef Notes / Reason:", f" {reason}"))
 
-    lines.append("============================")
-    return "\n".join(lines)
+    parts.append("============================")
+    return "\n".join(parts)
 
 
 def _compose_placeholder_message(reason: str) -> str:
@@ -117,7 +367,7 @@ def _print_recipe(recipe: Dict[str, Any]) -> None:
     print(f"👨‍🍳  Recipe: {recipe.get('title','(unknown)')}")
     print("---------------------------------------------------")
     print("🧺  Ingredients:")
-    for it in recipe.get("matched_expiring", []) + recipe.get("inventory", []) + recipe.get("missing", []):
+    for it in _iter_ingredients(recipe):
         print(f"  • {it}")
     print("---------------------------------------------------")
     if recipe.get("reason"):
@@ -167,12 +417,14 @@ def main() -> None:
         out_path.write_text(_compose_placeholder_message(reason), encoding="utf-8")
         return
 
-    # 3) Find the matching recipe by title
-    recipe = _find_recipe_in_best(selected_title, best_recipes)
+    # 3) Find the matching recipe by title (retrieved files as fuzzy fallback)
+    recipe = _find_recipe_in_best(selected_title, _build_title_index(best_recipes))
+    if not recipe:
+        recipe = _find_recipe_in_retrieved(selected_title, _load_all_retrieved())
     if not recipe:
         reason = (
             f"Selected recipe '{selected_title}' was not found in "
-            f"{BEST_RECIPES_FILE.name}."
+            f"{BEST_RECIPES_FILE.name} or the retrieved dish files."
         )
         _print_placeholder(reason)
         out_path.write_text(_compose_placeholder_message(reason), encoding="utf-8")
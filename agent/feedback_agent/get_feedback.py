@@ -1,3 +1,5 @@
+import functools
+import itertools
 import os
 import json
 import shutil
@@ -6,9 +8,34 @@ from utils.chat_and_embedding import LLMChat
 from langchain.prompts import ChatPromptTemplate, SystemMessagePromptTemplate, HumanMessagePromptTemplate, \
     PromptTemplate
 
+try:
+    import orjson  # optional: much faster JSON parsing
+except ImportError:
+    orjson = None
+
 # The number of past runs (data points) required to trigger the feedback agent.
 LEN_FOR_FEEDBACK = 10
 
+
+@functools.lru_cache(maxsize=8)
+def _get_prompt_template(path: str, mtime: float) -> ChatPromptTemplate:
+    """Build the chat prompt template for the feedback agent.
+
+    Jinja compilation is relatively expensive, so the compiled template is
+    cached keyed by (path, mtime) and only rebuilt when the prompt file changes.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        system_prompt_text = f.read()
+
+    system_template = PromptTemplate(template=system_prompt_text, input_variables=["n_runs"], template_format="jinja2")
+    system_message = SystemMessagePromptTemplate(prompt=system_template)
+
+    human_message = HumanMessagePromptTemplate.from_template(
+        "Here is the history of expiring ingredients from the past {n_runs} runs (in JSON format):\n{ingredients}"
+    )
+
+    return ChatPromptTemplate.from_messages([system_message, human_message])
+
 def run_feedback_agent():
     # --- Paths ---
     # Determine the project root directory by moving up three levels from the current file's location.
@@ -29,8 +56,13 @@ def run_feedback_agent():
         return
 
     # Read the historical data of expiring ingredients from the JSON file.
-    with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-        history = json.load(f)
+    # The history grows run over run, so use orjson's C parser when available.
+    if orjson is not None:
+        with open(HISTORY_FILE, "rb") as f:
+            history = orjson.loads(f.read())
+    else:
+        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+            history = json.load(f)
 
     # Check if there is enough historical data to run the feedback agent.
     if len(history) < LEN_FOR_FEEDBACK:
@@ -38,31 +70,20 @@ def run_feedback_agent():
         return
 
     # --- Flatten ingredient data ---
-    # Create a single, flat list of all ingredient entries from the historical runs.
-    flat = []
-    for run in history:
-        for ing in run:
-            flat.append(ing)
-    # Convert the flattened list back into a JSON string for use in the prompt.
-    ingredient_json_str = json.dumps(flat, indent=2, ensure_ascii=False)
-
-    # --- Load system prompt ---
-    # Read the system prompt template from a text file.
-    with open(FEEDBACK_PROMPT_FILE, "r", encoding="utf-8") as f:
-        system_prompt_text = f.read()
+    # Create a single, flat list of all ingredient entries from the historical
+    # runs; chain.from_iterable flattens at C speed instead of a nested loop.
+    flat = list(itertools.chain.from_iterable(history))
+    # Convert the flattened list back into a compact JSON string for the
+    # prompt: the model does not need indentation, and every indent/space
+    # would be billed as prompt tokens.
+    if orjson is not None:
+        ingredient_json_str = orjson.dumps(flat).decode("utf-8")
+    else:
+        ingredient_json_str = json.dumps(flat, separators=(",", ":"), ensure_ascii=False)
 
     # --- Build prompt ---
-    # Create a SystemMessagePromptTemplate using the loaded prompt text and a variable for the number of runs.
-    system_template = PromptTemplate(template=system_prompt_text, input_variables=["n_runs"], template_format="jinja2")
-    system_message = SystemMessagePromptTemplate(prompt=system_template)
-
-    # Create a HumanMessagePromptTemplate with a placeholder for the ingredient history.
-    human_message = HumanMessagePromptTemplate.from_template(
-        "Here is the history of expiring ingredients from the past {n_runs} runs (in JSON format):\n{ingredients}"
-    )
-
-    # Combine the system and human messages into a single chat prompt template.
-    prompt_template = ChatPromptTemplate.from_messages([system_message, human_message])
+    # Fetch the compiled prompt template (cached; rebuilt only when the file changes).
+    prompt_template = _get_prompt_template(FEEDBACK_PROMPT_FILE, os.path.getmtime(FEEDBACK_PROMPT_FILE))
 
     # Format the prompt with the flattened ingredient data and the number of runs.
     messages = prompt_template.format_messages(
@@ -35,12 +35,14 @@ EMBEDDING_DIM = 1536
 class LLMChat:
     """Lightweight chat client around AzureChatOpenAI with token logging."""
 
-    def __init__(self, temp: float = 0):
+    def __init__(self, temp: float = 0, deployment: str | None = None):
+        # `deployment` lets callers route routine/structured tasks to a
+        # cheaper deployment; default stays the shared chat deployment.
         self.llm_chat = AzureChatOpenAI(
             api_key=AZURE_OPENAI_API_KEY,
             api_version=AZURE_OPENAI_API_VERSION,
             azure_endpoint=AZURE_OPENAI_ENDPOINT,
-            azure_deployment=CHAT_DEPLOYMENT_NAME,
+            azure_deployment=deployment or CHAT_DEPLOYMENT_NAME,
             temperature=temp
         )
 